@@ -1,21 +1,40 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, StringConstraints
+from typing_extensions import Annotated
 import os
+import io
 import asyncio
 import uuid
 import time
 from typing import Dict, Any
 import logging
-from huggingface_hub import InferenceClient
+from huggingface_hub import AsyncInferenceClient
+import aiofiles
 import tempfile
 import base64
 
+# pybase64 uses SIMD (AVX-512/AVX2/SSSE3) encoding, 4-10x faster than the
+# stdlib; fall back to base64 if it isn't available on the runtime
+try:
+    import pybase64
+    b64encode = pybase64.b64encode
+except ImportError:
+    b64encode = base64.b64encode
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="AI Video Generation API", version="1.0.0")
+# orjson serializes responses in C, 2-5x faster than stdlib json
+app = FastAPI(title="AI Video Generation API", version="1.0.0",
+              default_response_class=ORJSONResponse)
+
+# Compress responses over 1KB - base64 uses a 64-symbol alphabet, so its
+# ~33% size inflation compresses away almost entirely on the wire
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # CORS middleware - allow all origins for Vercel deployment
 app.add_middleware(
@@ -28,25 +47,85 @@ app.add_middleware(
 
 # Initialize video generator (stateless for Vercel)
 class VideoRequest(BaseModel):
-    prompt: str
+    # Validated by pydantic-core (Rust) at parse time - requests with a
+    # too-short prompt are rejected before any handler code runs
+    prompt: Annotated[str, StringConstraints(strip_whitespace=True, min_length=3)]
     duration: int = 5
 
 class VideoResponse(BaseModel):
     status: str
     video_url: str = None
-    video_data: str = None  # Base64 encoded video for serverless
+    video_data: str = None  # URL of the /stream-video/{task_id} endpoint
     task_id: str = None
     message: str = None
 
+# Short-lived buffers for /stream-video - holds raw bytes (or a file path)
+# per task so we never keep the raw and base64 copies in memory at once
+_VIDEO_BUFFERS: Dict[str, Dict[str, Any]] = {}
+_BUFFER_TTL = 300  # seconds before a pending video buffer is dropped
+
+# Base64 encodes 3-byte groups, so a multiple-of-57 chunk size means
+# no padding characters appear mid-stream
+_STREAM_CHUNK_SIZE = 57 * 1024
+
+# Read the token once at import - config doesn't change mid-process
+HF_TOKEN = os.environ.get("HF_TOKEN")
+if not HF_TOKEN:
+    logger.warning("HF_TOKEN not configured - video generation will fail")
+
+# Reuse one AsyncInferenceClient across warm invocations - its httpx
+# session keeps a connection pool, so we skip the TLS handshake on
+# repeat calls. Being async, the 1-4 minute inference just yields the
+# event loop instead of parking a worker thread (and its ~8MB stack)
+_HF_CLIENT = None
+
+def _get_client() -> AsyncInferenceClient:
+    global _HF_CLIENT
+    if _HF_CLIENT is None:
+        _HF_CLIENT = AsyncInferenceClient(api_key=HF_TOKEN)
+    return _HF_CLIENT
+
+def _extract_path(result: str):
+    # Only stat() strings that could plausibly be a filesystem path -
+    # prompt-shaped or binary-garbage strings never hit the disk
+    if len(result) < 4096 and '\x00' not in result and os.path.exists(result):
+        return {"path": result}
+    return None
+
+# Exact-type dispatch for HF client results - one dict lookup instead of
+# a hasattr/isinstance ladder per call
+_EXTRACTORS = {
+    bytes: lambda r: {"data": r},
+    bytearray: lambda r: {"data": bytes(r)},
+    str: _extract_path,
+}
+
+def _extract_video(video_result):
+    """Map an HF client result to a stream-buffer entry"""
+    extractor = _EXTRACTORS.get(type(video_result))
+    if extractor is not None:
+        return extractor(video_result)
+    # Duck-typed fallbacks for response-like and file-like objects
+    if hasattr(video_result, 'content'):
+        return {"data": video_result.content}
+    if hasattr(video_result, 'read'):
+        return {"data": video_result.read()}
+    return None
+
+def _evict_expired_buffers():
+    """Drop video buffers older than the TTL to bound memory"""
+    now = time.time()
+    expired = [t for t, e in _VIDEO_BUFFERS.items() if now - e["created_at"] > _BUFFER_TTL]
+    for task_id in expired:
+        _VIDEO_BUFFERS.pop(task_id, None)
+
 # Stateless video generation for Vercel
 async def generate_video_serverless(prompt: str, duration: int) -> Dict[str, Any]:
     """Generate video in stateless serverless environment"""
     task_id = str(uuid.uuid4())
     
     try:
-        # Get HF token from environment
-        hf_token = os.environ.get("HF_TOKEN")
-        if not hf_token:
+        if not HF_TOKEN:
             return {
                 "status": "error",
                 "message": "HF_TOKEN not configured",
@@ -55,18 +134,15 @@ async def generate_video_serverless(prompt: str, duration: int) -> Dict[str, Any
         
         logger.info(f"Starting serverless video generation: {prompt}")
         
-        # Create HF client
-        client = InferenceClient(api_key=hf_token)
+        # Reuse the module-level async HF client (warm containers keep the pool)
+        client = _get_client()
         
         # Generate video with shorter timeout for serverless
         try:
             video_result = await asyncio.wait_for(
-                asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: client.text_to_video(
-                        prompt,
-                        model="Wan-AI/Wan2.2-T2V-A14B",
-                    )
+                client.text_to_video(
+                    prompt,
+                    model="Wan-AI/Wan2.2-T2V-A14B",
                 ),
                 timeout=240  # 4 minute timeout for Vercel Pro
             )
@@ -80,28 +156,20 @@ async def generate_video_serverless(prompt: str, duration: int) -> Dict[str, Any
         logger.info(f"Video generation completed, type: {type(video_result)}")
         
         if video_result:
-            # Handle different response types and convert to base64
-            video_data = None
-            
-            if hasattr(video_result, 'content'):
-                video_data = video_result.content
-            elif isinstance(video_result, bytes):
-                video_data = video_result
-            elif hasattr(video_result, 'read'):
-                video_data = video_result.read()
-            elif isinstance(video_result, str) and os.path.exists(video_result):
-                with open(video_result, 'rb') as f:
-                    video_data = f.read()
-            
-            if video_data:
-                # Convert to base64 for transmission
-                video_base64 = base64.b64encode(video_data).decode('utf-8')
-                
-                logger.info(f"Video encoded successfully, size: {len(video_data)} bytes")
-                
+            # Keep a single copy of the bytes (or just the file path) and
+            # let /stream-video encode it
+            buffer_entry = _extract_video(video_result)
+
+            if buffer_entry:
+                _evict_expired_buffers()
+                buffer_entry["created_at"] = time.time()
+                _VIDEO_BUFFERS[task_id] = buffer_entry
+
+                logger.info(f"Video buffered for streaming, task: {task_id}")
+
                 return {
                     "status": "success",
-                    "video_data": video_base64,
+                    "video_data": f"/stream-video/{task_id}",
                     "task_id": task_id,
                     "message": "Video generated successfully"
                 }
@@ -126,25 +194,85 @@ async def generate_video_serverless(prompt: str, duration: int) -> Dict[str, Any
             "task_id": task_id
         }
 
+# Pre-serialized payloads - health probes skip JSON encoding entirely
+_ROOT_BODY = b'{"message":"AI Video Generation API (Serverless)","status":"running"}'
+_HEALTH_BODY = b'{"status":"healthy","service":"AI Video Generation API (Serverless)"}'
+
 @app.get("/")
 async def root():
-    return {"message": "AI Video Generation API (Serverless)", "status": "running"}
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "AI Video Generation API (Serverless)"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
+
+@app.get("/stream-video/{task_id}")
+async def stream_video(task_id: str):
+    """Stream a generated video as chunked base64 (bounded memory)"""
+    _evict_expired_buffers()
+    entry = _VIDEO_BUFFERS.get(task_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Video not found or expired")
+
+    async def encode_chunks():
+        try:
+            if "path" in entry:
+                async with aiofiles.open(entry["path"], "rb") as f:
+                    while chunk := await f.read(_STREAM_CHUNK_SIZE):
+                        yield b64encode(chunk)
+            else:
+                buffer = io.BytesIO(entry["data"])
+                while chunk := buffer.read(_STREAM_CHUNK_SIZE):
+                    yield b64encode(chunk)
+        finally:
+            # One-shot delivery - free the buffer once the client has pulled it
+            _VIDEO_BUFFERS.pop(task_id, None)
+
+    return StreamingResponse(encode_chunks(), media_type="application/octet-stream")
+
+@app.post("/generate-video-binary")
+async def generate_video_binary(request: VideoRequest):
+    """Generate a video and return raw MP4 bytes - no base64 round-trip
+
+    Skips the 33% base64 inflation and the encode/decode CPU cost entirely;
+    task_id/status travel in response headers. Clients read the body with
+    response.arrayBuffer() and play it via a blob URL.
+    """
+    logger.info(f"Received binary video generation request: {request.prompt}")
 
-@app.post("/generate-video", response_model=VideoResponse)
+    result = await generate_video_serverless(
+        prompt=request.prompt,
+        duration=request.duration
+    )
+
+    if result["status"] != "success":
+        raise HTTPException(status_code=500, detail=result["message"])
+
+    # Claim the buffered video and materialize it for the binary response
+    entry = _VIDEO_BUFFERS.pop(result["task_id"], None)
+    if not entry:
+        raise HTTPException(status_code=500, detail="Generated video buffer expired")
+
+    if "path" in entry:
+        async with aiofiles.open(entry["path"], "rb") as f:
+            video_data = await f.read()
+    else:
+        video_data = entry["data"]
+
+    return Response(
+        content=video_data,
+        media_type="video/mp4",
+        headers={"X-Task-Id": result["task_id"], "X-Status": "success"}
+    )
+
+# Deprecated: prefer /generate-video-binary, which avoids base64 entirely
+@app.post("/generate-video", response_model=VideoResponse, deprecated=True)
 async def generate_video(request: VideoRequest):
     """Generate a video based on the provided prompt (serverless)"""
     try:
         logger.info(f"Received serverless video generation request: {request.prompt}")
-        
-        # Validate prompt
-        if not request.prompt or len(request.prompt.strip()) < 3:
-            raise HTTPException(status_code=400, detail="Prompt must be at least 3 characters long")
-        
-        # Generate video
+
+        # Generate video (prompt already validated by the model)
         result = await generate_video_serverless(
             prompt=request.prompt,
             duration=request.duration
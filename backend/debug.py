@@ -43,9 +43,14 @@ if hf_token:
 else:
     print("❌ HF_TOKEN not found!")
 
-# Show all environment variables starting with HF
-hf_vars = {k: v for k, v in os.environ.items() if k.startswith('HF')}
-print(f"All HF environment variables: {hf_vars}")
+# Show the HF environment variables we actually care about - avoids
+# copying the whole environ just to filter it
+hf_vars = {}
+for k in ("HF_TOKEN", "HF_HOME", "HF_HUB_CACHE", "HF_HUB_OFFLINE"):
+    v = os.environ.get(k)
+    if v is not None:
+        hf_vars[k] = v
+print(f"HF environment variables: {hf_vars}")
 
 # Test Hugging Face client initialization
 print("\n🤖 Testing Hugging Face Client")
@@ -1,17 +1,63 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, Field, StringConstraints
+from typing_extensions import Annotated
+import email.utils
+import gzip
+import hashlib
+import mimetypes
+import mmap
 import os
+import re
+from pathlib import Path
 from models.video_generator import VideoGenerator
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+# brotli compresses text assets ~25% smaller than gzip; optional so the
+# app still runs where the wheel isn't available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Setup logging - handlers run on a background listener thread, so
+# request handlers only enqueue records instead of formatting and
+# writing to stderr under the logging lock
+_log_queue = queue.Queue(-1)
+_root_logger = logging.getLogger()
+_root_logger.setLevel(logging.INFO)
+_root_logger.addHandler(QueueHandler(_log_queue))
+_log_listener = QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="AI Video Generation Full-Stack App", version="1.0.0")
+# orjson serializes responses in C, 2-5x faster than stdlib json
+app = FastAPI(title="AI Video Generation Full-Stack App", version="1.0.0",
+              default_response_class=ORJSONResponse)
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that leaves /media responses untouched.
+
+    MP4s are already compressed, so gzipping them burns CPU and copies
+    the whole payload through userspace - exactly what the zero-copy
+    video route avoids. GZipResponder also only forwards start/body ASGI
+    messages, which would drop the http.response.zerocopysend message
+    and hang the response on servers that support it.
+    """
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/media"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+# Compress responses over 1KB - base64/JSON payloads shrink dramatically
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=1024)
 
 # CORS middleware
 app.add_middleware(
@@ -26,8 +72,10 @@ app.add_middleware(
 video_generator = VideoGenerator()
 
 class VideoRequest(BaseModel):
-    prompt: str
-    duration: int = 5  # Default to 5 seconds (Wan-AI model limitation)
+    # Validated in pydantic-core's Rust fast path - bad requests 422
+    # before the handler runs
+    prompt: Annotated[str, StringConstraints(strip_whitespace=True, min_length=3, max_length=2000)]
+    duration: Annotated[int, Field(ge=1, le=30)] = 5  # Default to 5 seconds (Wan-AI model limitation)
 
 class VideoResponse(BaseModel):
     status: str
@@ -37,44 +85,87 @@ class VideoResponse(BaseModel):
 
 # Debug build structure
 def debug_build_structure():
-    logger.info("🔍 DEBUGGING BUILD STRUCTURE")
-    
+    # Production default is INFO - return before any I/O happens
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+
+    logger.debug("🔍 DEBUGGING BUILD STRUCTURE")
+
     if os.path.exists("frontend_build"):
         for root, dirs, files in os.walk("frontend_build"):
             level = root.replace("frontend_build", "").count(os.sep)
             indent = "  " * level
-            logger.info(f"{indent}{os.path.basename(root)}/")
+            logger.debug(f"{indent}{os.path.basename(root)}/")
             subindent = "  " * (level + 1)
             for file in files:
-                logger.info(f"{subindent}{file}")
-        
-        # Check index.html content
+                logger.debug(f"{subindent}{file}")
+
+        # Check asset references in index.html with one regex pass
         index_path = "frontend_build/index.html"
         if os.path.exists(index_path):
             with open(index_path, 'r') as f:
                 content = f.read()
-                logger.info("🔍 CSS/JS REFERENCES IN INDEX.HTML:")
-                logger.info(content)
+            refs = re.findall(r'(?:href|src)="([^"]+\.(?:css|js))"', content)
+            logger.debug("🔍 CSS/JS REFERENCES IN INDEX.HTML:")
+            for ref in refs:
+                logger.debug(ref)
 
-debug_build_structure()
+# The full frontend_build walk costs O(files) syscalls and log I/O on
+# every cold start - only run it when explicitly requested
+if os.environ.get("DEBUG_BUILD"):
+    # The dump logs at DEBUG - force the level for the duration of the
+    # call so the flag still produces output at the INFO default
+    _prev_level = _root_logger.level
+    _root_logger.setLevel(logging.DEBUG)
+    debug_build_structure()
+    _root_logger.setLevel(_prev_level)
+
+# One scandir pass replaces the scattered os.path.exists probes below -
+# each of those was an extra stat syscall at startup
+if os.path.isdir("frontend_build"):
+    _FB_FILES = {e.name: e.stat().st_size for e in os.scandir("frontend_build") if e.is_file()}
+else:
+    _FB_FILES = None
+
+# Cache index.html once at startup - the build is immutable for the
+# process lifetime, so don't stat/open/read it on every SPA request
+_INDEX_BYTES = None
+_INDEX_ETAG = None
+if _FB_FILES is not None and "index.html" in _FB_FILES:
+    with open("frontend_build/index.html", "rb") as f:
+        _INDEX_BYTES = f.read()
+    _INDEX_ETAG = f'"{hashlib.md5(_INDEX_BYTES).hexdigest()}"'
+
+def _index_response(request: Request) -> Response:
+    """Serve the cached index.html, honoring If-None-Match with a 304"""
+    if request.headers.get("if-none-match") == _INDEX_ETAG:
+        return Response(status_code=304, headers={"ETag": _INDEX_ETAG})
+    return Response(
+        content=_INDEX_BYTES,
+        media_type="text/html",
+        headers={"ETag": _INDEX_ETAG, "Cache-Control": "no-cache"}
+    )
+
+# Pre-serialized payloads for load-balancer probes - returning a prebuilt
+# Response skips validation and JSON encoding on every hit
+_HEALTH_BODY = b'{"status":"healthy","service":"AI Video Generation Full-Stack App"}'
+_API_ROOT_BODY = b'{"message":"AI Video Generation API","status":"running","version":"1.0.0"}'
+_SIMPLE_HEALTH_BODY = b'{"status":"healthy"}'
 
 # API Routes
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "service": "AI Video Generation Full-Stack App"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 @app.get("/api")
 async def api_root():
-    return {"message": "AI Video Generation API", "status": "running", "version": "1.0.0"}
+    return Response(content=_API_ROOT_BODY, media_type="application/json")
 
 @app.post("/api/generate-video", response_model=VideoResponse)
 async def generate_video(request: VideoRequest):
     try:
         logger.info(f"Received video generation request: {request.prompt}")
-        
-        if not request.prompt or len(request.prompt.strip()) < 3:
-            raise HTTPException(status_code=400, detail="Prompt must be at least 3 characters long")
-        
+
         result = await video_generator.generate_video(
             prompt=request.prompt,
             duration=request.duration
@@ -107,75 +198,224 @@ async def get_video_status(task_id: str):
         logger.error(f"Error checking video status: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Status check failed: {str(e)}")
 
-# Create static directories
-os.makedirs("static/generated_videos", exist_ok=True)
+# static/generated_videos is created by VideoGenerator() at import time
+
+class ZeroCopyFileResponse(Response):
+    """Send a file through ASGI's http.response.zerocopysend extension.
+
+    When the server supports it the kernel pushes the file to the socket
+    via sendfile(2) with no userspace copies - generated MP4s are tens of
+    MB, so this halves CPU and memory traffic. Falls back to FileResponse
+    elsewhere.
+    """
+    def __init__(self, path: str, media_type: str = "video/mp4", headers: dict = None):
+        super().__init__(content=b"", media_type=media_type)
+        self.path = path
+        self.extra_headers = headers or {}
+
+    async def __call__(self, scope, receive, send):
+        if "http.response.zerocopysend" not in scope.get("extensions", {}):
+            # FileResponse setdefaults its own stat headers, so the
+            # validators passed in take precedence
+            await FileResponse(self.path, media_type=self.media_type,
+                               headers=self.extra_headers)(scope, receive, send)
+            return
+
+        size = os.path.getsize(self.path)
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            raw_headers = [
+                (b"content-type", self.media_type.encode()),
+                (b"content-length", str(size).encode()),
+            ]
+            raw_headers += [(k.lower().encode(), v.encode())
+                            for k, v in self.extra_headers.items()]
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": raw_headers,
+            })
+            await send({
+                "type": "http.response.zerocopysend",
+                "file": fd,
+                "offset": 0,
+                "count": size,
+            })
+        finally:
+            os.close(fd)
+
+# Registered before the /media mount so MP4 delivery takes the
+# zero-copy path; everything else under /media falls through to it
+@app.get("/media/generated_videos/{name}")
+async def serve_generated_video(name: str, request: Request):
+    """Serve a generated MP4, zero-copy when the ASGI server supports it"""
+    if "/" in name or name.startswith("."):
+        raise HTTPException(status_code=404)
+    path = os.path.join("static", "generated_videos", name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404)
+
+    # Same mtime-size validators FileResponse computes, checked up front
+    # so revalidations get a 304 on both the zero-copy path and the
+    # fallback instead of re-sending tens of MB
+    etag = hashlib.md5(f"{stat.st_mtime}-{stat.st_size}".encode()).hexdigest()
+    last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+    headers = {"etag": etag, "last-modified": last_modified}
+    if (request.headers.get("if-none-match") == etag or
+            request.headers.get("if-modified-since") == last_modified):
+        return Response(status_code=304, headers=headers)
+    return ZeroCopyFileResponse(path, headers=headers)
+
+# Generated videos live under /media so they never collide with the React
+# build's /static assets. Mounted after the /api routes above - Starlette
+# scans routes in registration order, so API calls never walk the mounts.
+app.mount("/media", StaticFiles(directory="static"), name="media")
+
+# Initialize the registry once; the loader reads types_map directly so
+# no request (or startup file) pays guess_type's parsing and lock
+mimetypes.init()
+
+_COMPRESSIBLE_SUFFIXES = {".js", ".css", ".html", ".svg", ".json", ".map", ".txt"}
+
+def _load_static_cache(directory: str) -> dict:
+    """Walk the build once and cache bytes + headers per relative URL path.
+
+    The React build is immutable for the process lifetime, so each file's
+    bytes, ETag, Last-Modified and Content-Type are computed once and
+    requests are answered from the cache - no stat/open/read syscalls,
+    and unknown paths (404 scans, traversal probes) fail on an O(1) dict
+    lookup.
+    """
+    cache = {}
+    for root, _dirs, files in os.walk(directory):
+        for name in files:
+            full = os.path.join(root, name)
+            rel = os.path.relpath(full, directory).replace(os.sep, "/")
+            data = Path(full).read_bytes()
+            etag = f'"{hashlib.blake2b(data, digest_size=16).hexdigest()}"'
+            last_modified = email.utils.formatdate(os.path.getmtime(full), usegmt=True)
+            ctype = mimetypes.types_map.get(Path(full).suffix, "application/octet-stream")
+            # Precompress text assets once per process - compression cost
+            # is amortized to startup, requests just pick the variant
+            br = gz = None
+            if Path(full).suffix in _COMPRESSIBLE_SUFFIXES:
+                if brotli is not None:
+                    br = brotli.compress(data, quality=11)
+                gz = gzip.compress(data, compresslevel=9)
+            cache[rel] = (data, br, gz, etag, last_modified, ctype)
+    return cache
+
+# CRA emits content-hashed filenames like main.8f3b2c1d.js - a new build
+# means a new URL, so these are safe to cache forever
+_HASHED_ASSET_RE = re.compile(r'\.[0-9a-f]{8,}\.(?:chunk\.)?(?:js|css|woff2?|png|jpe?g|svg)$')
+
+# Entry points that must revalidate so deploys are picked up
+_NO_CACHE_FILES = {"index.html", "manifest.json", "asset-manifest.json"}
 
-# FIXED: Mount video static files at a different path to avoid conflicts
-app.mount("/video-static", StaticFiles(directory="static"), name="video_static")
+def _cached_response(path: str, entry: tuple, request: Request) -> Response:
+    """Build a response from a cache entry, honoring conditional requests
+    and serving the best precompressed variant for Accept-Encoding"""
+    data, br, gz, etag, last_modified, ctype = entry
+
+    headers = {"ETag": etag, "Last-Modified": last_modified}
+    # Anything with compressed variants varies by Accept-Encoding even
+    # when this request gets the identity body (or a 304) - otherwise a
+    # shared cache could hand the uncompressed copy to gzip clients
+    if br is not None or gz is not None:
+        headers["Vary"] = "Accept-Encoding"
+    if _HASHED_ASSET_RE.search(path):
+        headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    elif path in _NO_CACHE_FILES:
+        headers["Cache-Control"] = "no-cache"
+
+    if (request.headers.get("if-none-match") == etag or
+            request.headers.get("if-modified-since") == last_modified):
+        return Response(status_code=304, headers=headers)
+
+    accept_encoding = request.headers.get("accept-encoding", "")
+    if br is not None and "br" in accept_encoding:
+        headers["Content-Encoding"] = "br"
+        data = br
+    elif gz is not None and "gzip" in accept_encoding:
+        headers["Content-Encoding"] = "gzip"
+        data = gz
+
+    return Response(content=data, media_type=ctype, headers=headers)
+
+_STATIC_CACHE = _load_static_cache("frontend_build") if _FB_FILES is not None else {}
 
 # Mount React build files correctly
-if os.path.exists("frontend_build"):
+if _FB_FILES is not None:
     logger.info("Frontend build directory found")
-    
-    # FIXED: Mount React static directory at /static to match HTML expectations
-    react_static_dir = "frontend_build/static"
-    if os.path.exists(react_static_dir):
-        # This is the key fix - mount at /static to match HTML requests
-        app.mount("/static", StaticFiles(directory=react_static_dir), name="react_static")
-        logger.info(f"✅ Mounted React static files at /static from {react_static_dir}")
-    
-    # Serve other React files
+
+    # Serve the hot root path from the startup cache (no disk access)
+    @app.get("/")
+    async def serve_react_root(request: Request):
+        """Serve React app root"""
+        if _INDEX_BYTES is not None:
+            return _index_response(request)
+        else:
+            return {"message": "Frontend build found but index.html missing"}
+
+    # Small, unchanging files served straight from memory - mmap'd once at
+    # startup so requests never open or read them from disk
+    _SMALL_FILES = {
+        "favicon.ico": "image/x-icon",
+        "manifest.json": "application/json",
+        "asset-manifest.json": "application/json",
+    }
+    _SMALL_CACHE = {}
+    for _name, _ctype in _SMALL_FILES.items():
+        _path = os.path.join("frontend_build", _name)
+        if _FB_FILES.get(_name, 0) > 0:
+            with open(_path, "rb") as _f:
+                _mm = mmap.mmap(_f.fileno(), 0, access=mmap.ACCESS_READ)
+                _SMALL_CACHE[_name] = (bytes(_mm), _ctype)
+                _mm.close()
+
+    def _small_file_response(name: str) -> Response:
+        entry = _SMALL_CACHE.get(name)
+        if entry is None:
+            raise HTTPException(status_code=404)
+        headers = {"Cache-Control": "no-cache"} if name in _NO_CACHE_FILES else None
+        return Response(content=entry[0], media_type=entry[1], headers=headers)
+
     @app.get("/favicon.ico")
     async def favicon():
-        favicon_path = "frontend_build/favicon.ico"
-        if os.path.exists(favicon_path):
-            return FileResponse(favicon_path)
-        raise HTTPException(status_code=404)
-    
+        return _small_file_response("favicon.ico")
+
     @app.get("/manifest.json")
     async def manifest():
-        manifest_path = "frontend_build/manifest.json"
-        if os.path.exists(manifest_path):
-            return FileResponse(manifest_path)
-        raise HTTPException(status_code=404)
-    
+        return _small_file_response("manifest.json")
+
     @app.get("/asset-manifest.json")
     async def asset_manifest():
-        manifest_path = "frontend_build/asset-manifest.json"
-        if os.path.exists(manifest_path):
-            return FileResponse(manifest_path)
+        return _small_file_response("asset-manifest.json")
+
+    # Everything else (/static/* build assets) resolves through the
+    # precompiled route table - one dict lookup, no StaticFiles middleware
+    # chain, no per-request path traversal or symlink checks. The catch-all
+    # lives in its own sub-app (no OpenAPI/docs machinery) mounted last, so
+    # the main router short-circuits /api/* and /media before reaching it.
+    spa_app = FastAPI(openapi_url=None, docs_url=None, redoc_url=None)
+
+    @spa_app.get("/{full_path:path}")
+    async def serve_spa(full_path: str, request: Request):
+        """Serve the React build from the in-memory route table"""
+        entry = _STATIC_CACHE.get(full_path)
+        if entry is not None:
+            return _cached_response(full_path, entry, request)
+        # Unknown non-dotted path: a React Router route - serve index.html
+        if "." not in full_path.rsplit("/", 1)[-1]:
+            return _index_response(request)
         raise HTTPException(status_code=404)
-    
-    # Serve React app for all other routes
-    @app.get("/{path:path}")
-    async def serve_react_app(path: str):
-        """Serve React app for all non-API routes"""
-        # Skip API routes and static files
-        if (path.startswith("api/") or 
-            path.startswith("static/") or 
-            path.startswith("video-static/") or
-            ("." in path.split("/")[-1] and not path.endswith('.html'))):
-            raise HTTPException(status_code=404)
-        
-        # Serve index.html for React Router
-        index_path = "frontend_build/index.html"
-        if os.path.exists(index_path):
-            return FileResponse(index_path, media_type="text/html")
-        else:
-            raise HTTPException(status_code=404, detail="Frontend not found")
-    
-    @app.get("/")
-    async def serve_react_root():
-        """Serve React app root"""
-        index_path = "frontend_build/index.html"
-        if os.path.exists(index_path):
-            return FileResponse(index_path, media_type="text/html")
-        else:
-            return {"message": "Frontend build found but index.html missing"}
+
+    app.mount("/", spa_app)
 else:
     logger.warning("Frontend build directory not found")
-    app.mount("/static", StaticFiles(directory="static"), name="static")
-    
+
     @app.get("/")
     async def root():
         return {
@@ -187,9 +427,20 @@ else:
 # Health check for deployment platforms
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    return Response(content=_SIMPLE_HEALTH_BODY, media_type="application/json")
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # uvloop (libuv event loop) and httptools (C HTTP parser) cut small-
+    # request latency vs the default asyncio + h11 stack. Access logging
+    # is off - it formats and writes a line per request.
+    # Task status lives in SQLite (WAL), so polls resolve on any worker
+    # and WEB_CONCURRENCY > 1 is safe. The one per-process piece left is
+    # the single-flight map, so duplicate-prompt dedup weakens slightly
+    # as workers scale - acceptable, the content-addressed files still
+    # collapse duplicates on disk.
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    uvicorn.run("main:app", host="0.0.0.0", port=port, loop="uvloop",
+                http="httptools", workers=workers,
+                log_level="warning", access_log=False)
@@ -1,11 +1,16 @@
 import os
 import asyncio
+import hashlib
+import sqlite3
+import threading
 import uuid
 import time
+from pathlib import Path
 from typing import Dict, Any
 import logging
 from dotenv import load_dotenv
-from huggingface_hub import InferenceClient
+import aiofiles
+import httpx
 import base64
 import tempfile
 
@@ -18,29 +23,90 @@ class VideoGenerator:
         # Hugging Face API Token
         self.hf_token = os.getenv("HF_TOKEN")
         
-        # Initialize Hugging Face client
-        self.client = None
+        # Async HTTP client for the HF Inference API - the event loop
+        # multiplexes all in-flight generations on one thread instead of
+        # parking an executor worker per multi-minute call
+        self._http = None
         if self.hf_token:
             try:
-                self.client = InferenceClient(
-                    provider="auto",
-                    api_key=self.hf_token,
+                self._http = httpx.AsyncClient(
+                    base_url="https://api-inference.huggingface.co",
+                    timeout=600,
+                    headers={"Authorization": f"Bearer {self.hf_token}"},
                 )
-                logger.info("Hugging Face InferenceClient initialized successfully")
+                logger.info("Hugging Face async HTTP client initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize Hugging Face client: {e}")
-                self.client = None
+                self._http = None
         else:
             logger.warning("HF_TOKEN not found, will use mock generation")
         
         # Model configuration
         self.model_name = "Wan-AI/Wan2.2-T2V-A14B"
-        
-        # Storage for tracking generation tasks
-        self.generation_tasks = {}
-        
+
+        # Output directory, created once here instead of per generation
+        self._video_dir = Path("static/generated_videos")
+        self._video_dir.mkdir(parents=True, exist_ok=True)
+
+        # SQLite-backed task table (WAL mode) - status polls work across
+        # workers and survive restarts, unlike the old in-process dict
+        self._task_ttl = 3600  # seconds before finished tasks are pruned
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect("tasks.db", check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "task_id TEXT PRIMARY KEY, status TEXT, video_url TEXT, "
+            "prompt TEXT, created_at REAL, error TEXT)"
+        )
+        self._db.commit()
+
+        # Single-flight map: concurrent requests for the same prompt
+        # attach to the first in-flight generation instead of firing
+        # duplicate (and very expensive) HF calls
+        self._inflight: Dict[str, asyncio.Future] = {}
+
         logger.info("VideoGenerator initialized")
-    
+
+    def _db_write(self, sql: str, params: tuple) -> None:
+        # The connection is shared across executor threads - serialize
+        with self._db_lock:
+            self._db.execute(sql, params)
+            self._db.commit()
+
+    async def _put_task(self, task_id: str, status: str, prompt: str) -> None:
+        """Insert a task row and prune expired ones (off the event loop)"""
+        def _insert():
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO tasks (task_id, status, prompt, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (task_id, status, prompt, time.time())
+                )
+                self._db.execute(
+                    "DELETE FROM tasks WHERE created_at < ?",
+                    (time.time() - self._task_ttl,)
+                )
+                self._db.commit()
+        await asyncio.to_thread(_insert)
+
+    async def _update_task(self, task_id: str, **fields) -> None:
+        """Update columns of an existing task row (no-op if missing)"""
+        sets = ", ".join(f"{name} = ?" for name in fields)
+        await asyncio.to_thread(
+            self._db_write,
+            f"UPDATE tasks SET {sets} WHERE task_id = ?",
+            (*fields.values(), task_id)
+        )
+
+    def _fetch_task(self, task_id: str):
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT status, video_url, error FROM tasks WHERE task_id = ?",
+                (task_id,)
+            ).fetchone()
+
     async def generate_video(self, prompt: str, duration: int = 5) -> Dict[str, Any]:
         """
         Generate video using Hugging Face Inference API
@@ -52,11 +118,32 @@ class VideoGenerator:
         duration = 5
         
         # Use Hugging Face client or fallback to mock
-        if self.client and self.hf_token:
-            return await self._generate_with_huggingface(prompt, duration, task_id)
-        else:
+        if self._http is None:
             # Mock generation for testing without API keys
             return await self._mock_generation(prompt, duration, task_id)
+
+        # Deduplicate concurrent identical prompts - later callers await
+        # the first request's future and share its result
+        key = hashlib.sha1(prompt.strip().lower().encode()).hexdigest()
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await inflight
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            result = await self._generate_with_huggingface(prompt, duration, task_id)
+            fut.set_result(result)
+        finally:
+            if not fut.done():
+                # _generate_with_huggingface raised - unblock any waiters
+                fut.set_result({
+                    "status": "error",
+                    "message": "Video generation failed",
+                    "task_id": task_id
+                })
+            self._inflight.pop(key, None)
+        return result
     
     async def _generate_with_huggingface(self, prompt: str, duration: int, task_id: str) -> Dict[str, Any]:
         """
@@ -66,70 +153,56 @@ class VideoGenerator:
             logger.info(f"Starting Hugging Face video generation with prompt: {prompt}")
             
             # Store task info
-            self.generation_tasks[task_id] = {
-                "status": "processing",
-                "provider": "huggingface",
-                "created_at": time.time(),
-                "prompt": prompt
-            }
-            
-            # Generate video using Hugging Face client
-            # Run in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
+            await self._put_task(task_id, "processing", prompt)
             
             # Calculate frames based on duration (fixed at 5 seconds for Wan-AI)
             # Most video models use 24fps, so for 5 seconds: 5 * 24 = 120 frames
             num_frames = 120  # Fixed for Wan-AI model
-            
+
+            # Content-addressed filename: the same prompt + generation
+            # parameters always map to the same file, the disk analog of
+            # an ETag. Pairs with the single-flight map for in-flight dedup.
+            content_key = hashlib.sha256(
+                f"{self.model_name}|{prompt.strip().lower()}|"
+                f"num_frames={num_frames}|steps=25|guidance=7.5".encode()
+            ).hexdigest()[:32]
+            video_filename = f"{content_key}.mp4"
+            video_path = str(self._video_dir / video_filename)
+            video_url = f"/media/generated_videos/{video_filename}"
+
+            # A finished file for this key short-circuits the entire HF call
+            if os.path.exists(video_path):
+                await self._update_task(task_id, status="completed", video_url=video_url)
+                logger.info(f"Serving cached video: {video_url}")
+                return {
+                    "status": "success",
+                    "video_url": video_url,
+                    "task_id": task_id,
+                    "message": "Video served from cache"
+                }
+
             logger.info(f"Generating 5-second video with {num_frames} frames using Wan-AI model")
-            
-            video_result = await loop.run_in_executor(
-                None, 
-                lambda: self.client.text_to_video(
-                    prompt,
-                    model=self.model_name,
-                    num_frames=num_frames,  # Use frames instead of duration
-                    num_inference_steps=25,  # Good quality vs speed balance
-                    guidance_scale=7.5,     # Standard guidance scale
-                )
-            )
-            
-            # Save the video result
-            if video_result:
-                # Create filename for the generated video
-                video_filename = f"generated_video_{task_id}.mp4"
-                video_path = f"static/generated_videos/{video_filename}"
-                
-                # Ensure directory exists
-                os.makedirs("static/generated_videos", exist_ok=True)
-                
-                # Save video file
-                if hasattr(video_result, 'content'):
-                    # If video_result has content attribute (bytes)
-                    with open(video_path, "wb") as f:
-                        f.write(video_result.content)
-                elif isinstance(video_result, bytes):
-                    # If video_result is bytes directly
-                    with open(video_path, "wb") as f:
-                        f.write(video_result)
-                else:
-                    # If video_result is a file-like object or path
-                    if hasattr(video_result, 'read'):
-                        with open(video_path, "wb") as f:
-                            f.write(video_result.read())
-                    else:
-                        # Assume it's a path or can be copied
-                        import shutil
-                        shutil.copy(str(video_result), video_path)
-                
-                # FIXED: Use the correct static path that matches our main.py mounting
-                video_url = f"/video-static/generated_videos/{video_filename}"
-                
+
+            # Stream the response body straight to disk in 64KB chunks -
+            # the video never fully resides in the Python heap
+            async with self._http.stream(
+                "POST",
+                f"/models/{self.model_name}",
+                json={
+                    "inputs": prompt,
+                    "parameters": {
+                        "num_frames": num_frames,  # Use frames instead of duration
+                        "num_inference_steps": 25,  # Good quality vs speed balance
+                        "guidance_scale": 7.5,     # Standard guidance scale
+                    },
+                },
+            ) as resp:
+                resp.raise_for_status()
+                total_bytes = await self._stream_to_disk(resp, video_path)
+
+            if total_bytes > 0:
                 # Update task status
-                self.generation_tasks[task_id].update({
-                    "status": "completed",
-                    "video_url": video_url
-                })
+                await self._update_task(task_id, status="completed", video_url=video_url)
                 
                 logger.info(f"Video generated successfully: {video_url}")
                 
@@ -140,11 +213,14 @@ class VideoGenerator:
                     "message": "Video generated successfully using Hugging Face"
                 }
             else:
-                # Generation failed
-                self.generation_tasks[task_id].update({
-                    "status": "failed",
-                    "error": "No video content received"
-                })
+                # Generation failed - the tmpfile path links nothing into
+                # place, but the fallback may have left an empty file
+                try:
+                    os.unlink(video_path)
+                except FileNotFoundError:
+                    pass
+                await self._update_task(task_id, status="failed",
+                                        error="No video content received")
                 
                 return {
                     "status": "error",
@@ -155,12 +231,11 @@ class VideoGenerator:
         except Exception as e:
             logger.error(f"Hugging Face generation error: {str(e)}")
             
-            # Update task status
-            if task_id in self.generation_tasks:
-                self.generation_tasks[task_id].update({
-                    "status": "failed",
-                    "error": str(e)
-                })
+            # Update task status (no-op if the row was never created)
+            try:
+                await self._update_task(task_id, status="failed", error=str(e))
+            except Exception as db_error:
+                logger.error(f"Failed to record task failure: {db_error}")
             
             # Check if it's a model limitation issue
             error_message = str(e)
@@ -173,6 +248,36 @@ class VideoGenerator:
                 "task_id": task_id
             }
     
+    async def _stream_to_disk(self, resp, video_path: str) -> int:
+        """
+        Stream a response body to video_path atomically
+        Bytes go to a temp file in the same directory and the final name
+        appears only after a full fsync + rename, so a crash mid-write
+        never leaves a partial MP4 for future requests to be served
+        """
+        total = 0
+        tmp_path = f"{video_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                async for chunk in resp.aiter_bytes(chunk_size=65536):
+                    await f.write(chunk)
+                    total += len(chunk)
+                await f.flush()
+                os.fsync(f.fileno())
+            if total > 0:
+                # Same-directory rename is atomic - readers see either the
+                # old file or the complete new one, never a partial write
+                os.rename(tmp_path, video_path)
+            else:
+                os.unlink(tmp_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        return total
+
     async def _mock_generation(self, prompt: str, duration: int, task_id: str) -> Dict[str, Any]:
         """
         Mock video generation for testing without API keys
@@ -183,15 +288,10 @@ class VideoGenerator:
         await asyncio.sleep(3)
         
         # Create a mock video URL that points to a placeholder
-        mock_video_url = "/video-static/generated_videos/mock_video.mp4"
+        mock_video_url = "/media/generated_videos/mock_video.mp4"
         
-        self.generation_tasks[task_id] = {
-            "status": "completed",
-            "video_url": mock_video_url,
-            "provider": "mock",
-            "created_at": time.time(),
-            "prompt": prompt
-        }
+        await self._put_task(task_id, "completed", prompt)
+        await self._update_task(task_id, video_url=mock_video_url)
         
         return {
             "status": "success",
@@ -204,29 +304,30 @@ class VideoGenerator:
         """
         Get the status of a generation task
         """
-        if task_id not in self.generation_tasks:
+        row = await asyncio.to_thread(self._fetch_task, task_id)
+        if row is None:
             return {"status": "error", "message": "Task not found"}
-        
-        task_info = self.generation_tasks[task_id]
-        
-        if task_info["status"] == "completed":
+
+        status, video_url, error = row
+
+        if status == "completed":
             return {
                 "status": "success",
-                "video_url": task_info["video_url"],
+                "video_url": video_url,
                 "task_id": task_id,
                 "message": "Video generation completed"
             }
-        elif task_info["status"] == "processing":
+        elif status == "processing":
             return {
                 "status": "processing",
                 "task_id": task_id,
                 "message": "Video is still being generated..."
             }
-        elif task_info["status"] == "failed":
+        elif status == "failed":
             return {
                 "status": "error",
                 "task_id": task_id,
-                "message": task_info.get("error", "Video generation failed")
+                "message": error or "Video generation failed"
             }
-        
-        return task_info
+
+        return {"status": status, "task_id": task_id}